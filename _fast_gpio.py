@@ -0,0 +1,66 @@
+"""
+Acceso directo a los registros GPIO del RP1 (Raspberry Pi 5)
+"""
+import mmap
+import struct
+
+# /dev/gpiomem0 mapea el bloque GPIO del RP1 a partir de 0x400d0000.
+# SYS_RIO0 está en +0x10000 y sus alias atómicos SET/CLR en +0x2000/+0x3000:
+# una escritura de 32 bits cambia los pines indicados en la máscara sin
+# leer-modificar-escribir.
+RP1_GPIOMEM = '/dev/gpiomem0'
+RP1_GPIOMEM_SIZE = 0x30000
+RIO0_SET = 0x12000
+RIO0_CLR = 0x13000
+
+# Pines del banco 0 (cabecera de 40 pines)
+BANK0_PINS = 28
+
+_REG = struct.Struct("<I")
+
+class RP1Gpio:
+    """
+    Escritura de niveles en los pines del banco 0 del RP1 mediante MMIO
+    
+    Los pines deben estar ya configurados como salidas por un módulo GPIO
+    (RPi.GPIO, gpiod o lgpio); aquí solo se cambian sus niveles.
+    
+    Args:
+        path (str): Dispositivo de memoria GPIO del RP1
+    
+    Raises:
+        OSError: Si no se puede abrir o mapear el dispositivo
+    """
+    def __init__(self, path=RP1_GPIOMEM):
+        with open(path, 'r+b') as f:
+            self._mem = mmap.mmap(f.fileno(), RP1_GPIOMEM_SIZE)
+    
+    @staticmethod
+    def mask(*pins):
+        """Devuelve la máscara de bits de los pines indicados"""
+        mask = 0
+        for pin in pins:
+            if not 0 <= pin < BANK0_PINS:
+                raise ValueError(f"GPIO{pin} no está en el banco 0 (GPIO0-{BANK0_PINS - 1})")
+            mask |= 1 << pin
+        return mask
+    
+    def setter(self):
+        """Devuelve una función f(mask) que pone a 1 los pines de la máscara"""
+        mem, pack_into = self._mem, _REG.pack_into
+        
+        def gpio_set(mask):
+            pack_into(mem, RIO0_SET, mask)
+        return gpio_set
+    
+    def clearer(self):
+        """Devuelve una función f(mask) que pone a 0 los pines de la máscara"""
+        mem, pack_into = self._mem, _REG.pack_into
+        
+        def gpio_clr(mask):
+            pack_into(mem, RIO0_CLR, mask)
+        return gpio_clr
+    
+    def close(self):
+        """Libera el mapeo de memoria"""
+        self._mem.close()
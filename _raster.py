@@ -0,0 +1,69 @@
+"""
+Rasterizado de glifos compilado con Numba (opcional)
+"""
+import sys
+
+import numpy as np
+
+from .fonts import FONT_TABLE
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+if njit is not None:
+    # Filas de cada glifo como arrays listos para el núcleo compilado (int64,
+    # para que las máscaras se calculen con signo y sin desbordar)
+    _FONT_ROWS = FONT_TABLE.astype(np.int64)
+    
+    # Orden de bytes de la CPU (la Raspberry Pi es little-endian)
+    _LITTLE_ENDIAN = sys.byteorder == 'little'
+    
+    @njit(cache=True, boundscheck=False)
+    def _expand_glyph(rows, size, color, bg_color):
+        """Expande las 8 filas de bits a (8*size)x(8*size) píxeles RGB565 big-endian"""
+        row_px = 8 * size
+        out = np.empty(row_px * 8 * size, dtype=np.uint16)
+        if _LITTLE_ENDIAN:
+            # Colores con los bytes ya intercambiados: cada píxel se guarda
+            # con un solo acceso de 16 bits y queda en big-endian en memoria
+            color = ((color << 8) | (color >> 8)) & 0xFFFF
+            bg_color = ((bg_color << 8) | (bg_color >> 8)) & 0xFFFF
+        
+        idx = 0
+        for r in range(8):
+            bits = rows[r]
+            start = idx
+            for c in range(8):
+                # Máscara de todo unos o todo ceros según el bit: elige el
+                # color sin saltos condicionales
+                m = -((bits >> (7 - c)) & 1) & 0xFFFF
+                px = (color & m) | (bg_color & ~m & 0xFFFF)
+                for sc in range(size):
+                    out[idx] = px
+                    idx += 1
+            
+            # Las demás filas escaladas repiten la primera
+            for sr in range(1, size):
+                out[idx:idx + row_px] = out[start:start + row_px]
+                idx += row_px
+        return out.view(np.uint8)
+    
+    def render_glyph(code, color, bg_color, size):
+        """
+        Renderiza un carácter de FONT_TABLE con el núcleo compilado
+        
+        Args:
+            code (int): Índice del carácter en FONT_TABLE
+            color (int): Color del texto (RGB565)
+            bg_color (int): Color de fondo (RGB565)
+            size (int): Factor de escala
+        
+        Returns:
+            bytes: (8*size)x(8*size) píxeles en big-endian
+        """
+        return _expand_glyph(_FONT_ROWS[code], size, color, bg_color).tobytes()
+else:
+    # Sin Numba, graphics usa el rasterizado con NumPy
+    render_glyph = None
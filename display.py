@@ -2,14 +2,123 @@
 Clase principal que maneja la comunicación con la pantalla ST7796
 """
 import time
+import logging
 import spidev
 import sys
 import platform
 import os
+import struct
+import threading
+import queue
+from contextlib import contextmanager
+import numpy as np
+from ._fast_gpio import RP1Gpio
+
+# Mensajes de inicialización y rotación, a nivel DEBUG
+logger = logging.getLogger(__name__)
 
 # Intentar cargar los módulos GPIO según disponibilidad
 GPIO = None
 
+# Niveles de las líneas gpiod solicitadas en bloque, en orden (DC, CS, RST)
+_CMD_SELECT = [0, 0, 1]
+_DATA_SELECT = [1, 0, 1]
+_IDLE = [1, 1, 1]
+_RESET = [1, 1, 0]
+
+# Secuencia de inicialización del ST7796 como tuplas (comando, parámetros);
+# un entero N indica que lo que sigue no se envía antes de N ms desde Sleep Out
+# (el primer comando). Tras Sleep Out el controlador acepta comandos a los
+# 5 ms; la configuración se envía mientras tanto y Display On espera a 120 ms.
+_INIT_SEQ = (
+    (b'\x11', b''),  # Sleep Out
+    5,
+    (b'\x36', b'\x48'),
+    (b'\x3A', b'\x55'),  # 16 bits por pixel (RGB565)
+    (b'\xF0', b'\xC3'),
+    (b'\xF0', b'\x96'),
+    (b'\xB4', b'\x02'),
+    (b'\xB7', b'\xC6'),
+    (b'\xC0', b'\xC0\x00'),
+    (b'\xC1', b'\x13'),
+    (b'\xC2', b'\xA7'),
+    (b'\xC5', b'\x21'),
+    (b'\xE8', b'\x40\x8A\x1B\x1B\x23\x0A\xAC\x33'),
+    # Gamma settings
+    (b'\xE0', b'\xD2\x05\x08\x06\x05\x02\x2A\x44\x46\x39\x15\x15\x2D\x32'),  # Positive Gamma
+    (b'\xE1', b'\x96\x08\x0C\x09\x09\x25\x2E\x43\x42\x35\x11\x11\x28\x2E'),  # Negative Gamma
+    (b'\xF0', b'\x3C'),
+    (b'\xF0', b'\x69'),
+    120,  # Desde Sleep Out, no desde el comando anterior
+    (b'\x21', b''),  # Display Inversion On
+    (b'\x29', b''),  # Display On
+)
+
+def _build_init_script(seq):
+    """
+    Convierte _INIT_SEQ en tramos listos para _write_seq
+    
+    Cada tramo es una tupla (inicio, bloques): inicio es el momento, en
+    milisegundos desde el primer tramo, antes del cual no debe enviarse, y
+    bloques son los pares (dc, bytes) con los consecutivos del mismo nivel
+    ya unidos.
+    """
+    script = []
+    start = 0
+    run = []
+    for entry in seq + (None,):
+        if entry is None or isinstance(entry, int):
+            if run:
+                script.append((start, tuple((dc, bytes(data)) for dc, data in run)))
+            start = entry
+            run = []
+            continue
+        for dc, data in zip((0, 1), entry):
+            if not data:
+                continue
+            if run and run[-1][0] == dc:
+                run[-1][1].extend(data)
+            else:
+                run.append((dc, bytearray(data)))
+    return tuple(script)
+
+# Secuencia de inicialización precalculada una sola vez
+_INIT_SCRIPT = _build_init_script(_INIT_SEQ)
+
+# Parámetro de Memory Access Control (0x36) y tamaño para cada rotación
+_ROTATIONS = (
+    (b'\x48', 320, 480),  # 0 grados
+    (b'\x28', 480, 320),  # 90 grados
+    (b'\x88', 320, 480),  # 180 grados
+    (b'\xE8', 480, 320),  # 270 grados
+)
+
+# Máximo de segmentos por llamada a os.writev (IOV_MAX en Linux)
+_IOV_MAX = 1024
+
+# Número máximo de bloques de color guardados en caché por pantalla (cada
+# bloque ocupa un bloque de escritura: como mucho 64 KiB)
+COLOR_CACHE_SIZE = 16
+
+# Operaciones pendientes como máximo en la cola del hilo escritor
+ASYNC_QUEUE_SIZE = 64
+
+# Objetos bytes de un solo byte para comandos y parámetros sueltos
+_BYTE = tuple(bytes((i,)) for i in range(256))
+
+# Un píxel RGB565 en el orden de bytes del bus
+_pack_pixel = struct.Struct('>H').pack
+
+# Paquete de ventana: CASET (inicio, fin), RASET (inicio, fin) y RAMWR
+_pack_window = struct.Struct('>BHHBHHB').pack
+
+# Bit DC de cada byte del paquete de ventana en modo de 9 bits
+_WINDOW_DC = np.array([0, 1, 1, 1, 1, 0, 1, 1, 1, 1, 0], dtype=np.uint16) << 8
+
+def _noop(*args):
+    """Operación de bus sin línea que conmutar"""
+    pass
+
 # Función para detectar automáticamente la plataforma de hardware
 def detect_rpi_model():
     try:
@@ -25,6 +134,56 @@ def detect_rpi_model():
         # Si no podemos detectar, asumimos 4 por seguridad
         return 4
 
+# Reloj de entrada del controlador SPI por modelo (RP1 en RPi 5, núcleo
+# VideoCore en RPi 4 con la configuración por defecto)
+_SPI_SOURCE_CLOCK_HZ = {5: 200000000, 4: 500000000}
+
+def estimate_spi_clock(speed_hz, rpi_model):
+    """
+    Estima la frecuencia SPI real para una velocidad solicitada
+    
+    Ambos controladores dividen su reloj de entrada por un divisor par,
+    redondeando hacia abajo la frecuencia (en RPi 5, 80 MHz se quedan en
+    50 MHz y 100 MHz es el máximo real).
+    
+    Args:
+        speed_hz (int): Velocidad solicitada en Hz
+        rpi_model (int): Modelo detectado por detect_rpi_model()
+        
+    Returns:
+        int: Frecuencia estimada en Hz, o None si el modelo no es conocido
+    """
+    source_hz = _SPI_SOURCE_CLOCK_HZ.get(rpi_model)
+    if source_hz is None or speed_hz <= 0:
+        return None
+    divisor = max(2, -(-source_hz // speed_hz))
+    divisor += divisor & 1
+    return source_hz // divisor
+
+def read_spidev_bufsiz(default=4096):
+    """Lee el tamaño máximo de transferencia del módulo spidev del kernel"""
+    try:
+        with open('/sys/module/spidev/parameters/bufsiz', 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return default
+
+def rgb888_to_rgb565(rgb):
+    """
+    Convierte una imagen RGB888 a RGB565 de forma vectorizada
+    
+    Args:
+        rgb (numpy.ndarray): Array (alto, ancho, 3) de uint8
+        
+    Returns:
+        numpy.ndarray: Array (alto, ancho) de uint16 en RGB565
+    """
+    rgb = np.asarray(rgb, dtype=np.uint8)
+    r = rgb[..., 0].astype(np.uint16)
+    g = rgb[..., 1].astype(np.uint16)
+    b = rgb[..., 2].astype(np.uint16)
+    return ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+
 def import_gpio():
     global GPIO
     try:
@@ -60,12 +219,22 @@ class ST7796:
         rotation (int): Rotación de la pantalla (0-3)
         dc_pin (int): Pin de Data/Command (GPIO)
         rst_pin (int): Pin de Reset (GPIO)
-        cs_pin (int): Pin de Chip Select (GPIO)
-        spi_speed_hz (int): Velocidad SPI en Hz
+        cs_pin (int): Pin de Chip Select (GPIO); None si el CS lo gestiona
+            spidev (CE0 o dtoverlay=spi0-1cs,cs0_pin=N)
+        spi_speed_hz (int): Velocidad SPI en Hz (el controlador la redondea
+            hacia abajo; ver estimate_spi_clock)
+        gpio_chip (str): Chip GPIO para gpiod (auto-detectado si es None)
+        fast_gpio (bool): Controlar DC/CS escribiendo directamente en los
+            registros del RP1 (solo RPi 5, requiere /dev/gpiomem0)
+        async_spi (bool): Enviar las escrituras desde un hilo en segundo
+            plano; usar flush() para esperar a que terminen
+        spi_9bit (bool): Usar el modo SPI de 9 bits del ST7796 (IM
+            configurado para 3 hilos), con DC como noveno bit de cada palabra
     """
     def __init__(self, width=320, height=480, rotation=0, 
                  dc_pin=5, rst_pin=6, cs_pin=22, 
-                 spi_speed_hz=80000000, gpio_chip=None):
+                 spi_speed_hz=80000000, gpio_chip=None, fast_gpio=False,
+                 async_spi=False, spi_9bit=False):
         # Configuración de pantalla
         self.width = width
         self.height = height
@@ -82,19 +251,31 @@ class ST7796:
         print(f"Modelo RPi detectado: {self.rpi_model}")
         print(f"Módulo GPIO: {self.gpio_module}")
         
+        # Estado del bus: MMIO opcional, transacciones abiertas, chip
+        # seleccionado y nivel actual de DC
+        self._rio = None
+        self._txn_depth = 0
+        self._selected = False
+        self._dc_level = None
+        self._async = False
+        
         # Inicializar GPIO
         self._init_gpio(gpio_chip)
+        if fast_gpio:
+            self._init_gpio_mmio()
+        self._bind_gpio_ops()
         
         # Inicializar SPI
-        self._init_spi(spi_speed_hz)
+        self._init_spi(spi_speed_hz, spi_9bit)
         
         # Inicializar pantalla
         self.reset()
         self._init_display()
         self.set_rotation(rotation)
         
-        # Caché para caracteres
-        self.char_buffer_cache = {}
+        # Escritor en segundo plano (la inicialización ya es síncrona)
+        if async_spi and self.gpio_module != "DUMMY":
+            self._start_writer()
     
     def _init_gpio(self, gpio_chip):
         """Inicializa los pines GPIO utilizando el módulo disponible"""
@@ -108,12 +289,14 @@ class ST7796:
                 # Configurar pines como salidas
                 GPIO.setup(self.dc_pin, GPIO.OUT)
                 GPIO.setup(self.rst_pin, GPIO.OUT)
-                GPIO.setup(self.cs_pin, GPIO.OUT)
+                if self.cs_pin is not None:
+                    GPIO.setup(self.cs_pin, GPIO.OUT)
                 
                 # Establecer niveles iniciales
                 GPIO.output(self.dc_pin, GPIO.HIGH)
                 GPIO.output(self.rst_pin, GPIO.HIGH)
-                GPIO.output(self.cs_pin, GPIO.HIGH)
+                if self.cs_pin is not None:
+                    GPIO.output(self.cs_pin, GPIO.HIGH)
                 
                 # Guardar referencia a GPIO para métodos
                 self.GPIO = GPIO
@@ -140,15 +323,13 @@ class ST7796:
                 else:
                     self.chip = gpiod.Chip(gpio_chip)
                 
-                # Configurar líneas GPIO
-                self.dc_line = self.chip.get_line(self.dc_pin)
-                self.rst_line = self.chip.get_line(self.rst_pin)
-                self.cs_line = self.chip.get_line(self.cs_pin)
-                
-                # Solicitar líneas para salida
-                self.dc_line.request(consumer="st7796", type=gpiod.LINE_REQ_DIR_OUT)
-                self.rst_line.request(consumer="st7796", type=gpiod.LINE_REQ_DIR_OUT)
-                self.cs_line.request(consumer="st7796", type=gpiod.LINE_REQ_DIR_OUT)
+                # Solicitar DC, CS y RST juntos como salidas, para poder
+                # actualizarlas con una sola llamada set_values()
+                pins = [self.dc_pin, self.cs_pin, self.rst_pin]
+                self._gpiod_cols = [i for i, pin in enumerate(pins) if pin is not None]
+                self.lines = self.chip.get_lines([pins[i] for i in self._gpiod_cols])
+                self.lines.request(consumer="st7796", type=gpiod.LINE_REQ_DIR_OUT,
+                                   default_vals=self._gpiod_vals(_IDLE))
                 print("GPIO inicializado con gpiod")
                 
             elif self.gpio_module == "lgpio":
@@ -160,12 +341,14 @@ class ST7796:
                 # Configurar pines como salidas
                 lgpio.gpio_claim_output(self.gpio_handle, self.dc_pin)
                 lgpio.gpio_claim_output(self.gpio_handle, self.rst_pin)
-                lgpio.gpio_claim_output(self.gpio_handle, self.cs_pin)
+                if self.cs_pin is not None:
+                    lgpio.gpio_claim_output(self.gpio_handle, self.cs_pin)
                 
                 # Establecer niveles iniciales
                 lgpio.gpio_write(self.gpio_handle, self.dc_pin, 1)
                 lgpio.gpio_write(self.gpio_handle, self.rst_pin, 1)
-                lgpio.gpio_write(self.gpio_handle, self.cs_pin, 1)
+                if self.cs_pin is not None:
+                    lgpio.gpio_write(self.gpio_handle, self.cs_pin, 1)
                 
                 # Guardar referencia a lgpio
                 self.lgpio = lgpio
@@ -182,11 +365,102 @@ class ST7796:
             print(f"Error al inicializar GPIO: {e}")
             sys.exit(1)
     
-    def _init_spi(self, spi_speed_hz):
+    def _init_gpio_mmio(self):
+        """
+        Mapea los registros GPIO del RP1 para conmutar DC/CS sin syscalls
+        
+        Los pines siguen configurados como salidas por el módulo GPIO
+        elegido; aquí solo se sustituye la escritura de niveles por un
+        acceso a los registros atómicos SET/CLR de SYS_RIO0. Si no es
+        posible (otro modelo, sin permisos), se mantiene el módulo GPIO.
+        """
+        if self.rpi_model != 5 or self.gpio_module == "DUMMY":
+            print("GPIO por MMIO solo disponible en RPi 5, se usa " + self.gpio_module)
+            return
+        
+        try:
+            self._dc_mask = RP1Gpio.mask(self.dc_pin)
+            self._cs_mask = RP1Gpio.mask(self.cs_pin) if self.cs_pin is not None else 0
+            self._rio = RP1Gpio()
+        except ValueError as e:
+            print(f"GPIO por MMIO requiere DC y CS en el banco 0: {e}")
+            return
+        except OSError as e:
+            print(f"No se pudo mapear /dev/gpiomem0, se usa {self.gpio_module}: {e}")
+            return
+        
+        print("DC/CS controlados por MMIO (RP1 /dev/gpiomem0)")
+    
+    def _start_writer(self):
+        """
+        Arranca el hilo que ejecuta las operaciones del bus en segundo plano
+        
+        Las operaciones de GPIO y SPI de bajo nivel se sustituyen por
+        versiones que las encolan en orden; el hilo escritor las ejecuta
+        mientras el código llamante prepara los siguientes buffers. Los
+        buffers encolados no deben modificarse después de enviarlos.
+        
+        La cola está limitada a ASYNC_QUEUE_SIZE operaciones: si el código
+        llamante genera datos más rápido de lo que el bus los envía, espera
+        al hilo escritor en lugar de acumular buffers en memoria.
+        """
+        self._spi_q = queue.Queue(maxsize=ASYNC_QUEUE_SIZE)
+        for name in ('_select', '_deselect', '_set_dc', '_write', '_writev', '_write_block'):
+            setattr(self, name, self._queued(getattr(self, name)))
+        
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+        self._async = True
+        print("Escritura SPI asíncrona activada")
+    
+    def _queued(self, fn):
+        """Devuelve una versión de fn que encola la llamada para el hilo escritor"""
+        put = self._spi_q.put
+        def submit(*args):
+            put((fn, args))
+        return submit
+    
+    def _writer_loop(self):
+        """Ejecuta en orden las operaciones encoladas hasta recibir None"""
+        while True:
+            fn, args = self._spi_q.get()
+            if fn is None:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error en escritura SPI asíncrona: {e}")
+    
+    def flush(self):
+        """Espera a que el hilo escritor termine todas las operaciones pendientes"""
+        if not self._async:
+            return
+        done = threading.Event()
+        self._spi_q.put((done.set, ()))
+        done.wait()
+    
+    def _init_spi(self, spi_speed_hz, spi_9bit=False):
         """Inicializa el bus SPI"""
         try:
+            # Bloque de escritura limitado por spidev.bufsiz (múltiplo de 4
+            # bytes, para que cada bloque contenga píxeles completos también
+            # en modo de 9 bits)
+            self._spi_bufsiz = read_spidev_bufsiz()
+            self._spi_chunk = min(self._spi_bufsiz, 65536) & ~3
+            if self._spi_bufsiz < 65536 and os.name != 'nt':
+                logger.info("spidev.bufsiz=%d; con spidev.bufsiz=65536 los rellenos "
+                            "necesitan menos transferencias (ver README)",
+                            self._spi_bufsiz)
+            
+            # Bytes en el bus por píxel RGB565 (4 en modo de 9 bits)
+            self._wire_bpp = 2
+            
+            # Bloques de color ya construidos, indexados por color RGB565
+            self._color_buf_cache = {}
+            
             if os.name == 'nt':
                 # Modo de simulación para sistemas no-RPi
+                self._write = self._writev = self._write_block = lambda buf: None
                 print("Modo de simulación SPI (no RPi)")
                 return
                 
@@ -194,77 +468,341 @@ class ST7796:
             self.spi.open(0, 0)  # Bus 0, dispositivo 0
             self.spi.max_speed_hz = spi_speed_hz
             self.spi.mode = 0
-            print(f"SPI inicializado a {spi_speed_hz/1000000:.1f} MHz")
+            
+            # Todas las escrituras de datos pasan por aquí; _write_block
+            # envía bloques ya preparados para el bus (colores cacheados).
+            # writebytes2 toma cualquier objeto con protocolo de buffer sin
+            # convertir byte a byte como writebytes
+            if not hasattr(self.spi, 'writebytes2'):
+                raise RuntimeError("se necesita spidev>=3.5 (SpiDev.writebytes2)")
+            self._write = self._write_block = self.spi.writebytes2
+            if spi_9bit:
+                self._init_9bit()
+            # Frecuencia que realmente generará el controlador
+            self.spi_clock_hz = estimate_spi_clock(self.spi.max_speed_hz, self.rpi_model)
+            if self.spi_clock_hz is not None and self.spi_clock_hz != spi_speed_hz:
+                logger.info("SPI solicitado a %.1f MHz, real ~%.1f MHz",
+                            spi_speed_hz / 1000000, self.spi_clock_hz / 1000000)
+            print(f"SPI inicializado a {spi_speed_hz/1000000:.1f} MHz, bloques de {self._spi_chunk} bytes")
         except Exception as e:
             print(f"Error al inicializar SPI: {e}")
             sys.exit(1)
     
+    def _init_9bit(self):
+        """
+        Activa el modo SPI de 9 bits
+        
+        Cada byte viaja como una palabra de 9 bits cuyo bit alto es DC, así
+        que cambiar entre comando y datos ya no requiere tocar la línea DC:
+        _set_dc solo anota el nivel que usará la siguiente escritura. Si el
+        controlador SPI no admite 9 bits se mantiene el modo normal.
+        """
+        try:
+            self.spi.bits_per_word = 9
+        except (OSError, TypeError) as e:
+            print(f"Modo SPI de 9 bits no disponible ({e}), usando DC por GPIO")
+            return
+        
+        self._dc_bit = 0
+        self._wire_bpp = 4
+        select = self._select
+        
+        def select_9bit(dc):
+            self._dc_bit = dc
+            select(dc)
+        
+        self._select = select_9bit
+        self._set_dc = self._set_dc_9bit
+        self._write = self._write_9bit
+        
+        # Secuencias con comandos y datos mezclados: una sola escritura
+        self._write_seq = self._write_seq_9bit
+        self._send_window = self._send_window_9bit
+        print("SPI en modo de 9 bits (DC en el noveno bit)")
+    
+    def _set_dc_9bit(self, level):
+        """Anota el nivel DC para las siguientes palabras de 9 bits"""
+        self._dc_bit = level
+    
+    def _write_9bit(self, buf):
+        """
+        Envía un buffer de bytes como palabras de 9 bits con el DC actual
+        
+        spidev espera cada palabra en 16 bits con el orden de bytes nativo.
+        """
+        words = np.frombuffer(buf, dtype=np.uint8).astype(np.uint16)
+        words |= self._dc_bit << 8
+        self.spi.writebytes2(words.view(np.uint8))
+    
+    def _write_seq_9bit(self, seq):
+        """
+        Versión de _write_seq para el modo de 9 bits
+        
+        Como cada palabra lleva su propio DC, toda la secuencia se empaqueta
+        y se envía con una única escritura SPI.
+        """
+        words = [np.frombuffer(data, dtype=np.uint8).astype(np.uint16) | (level << 8)
+                 for level, data in seq]
+        if not words:
+            return
+        
+        self._begin_txn()
+        try:
+            self.start_write(seq[-1][0])  # DC queda en el nivel del último bloque
+            self._write_block(np.concatenate(words).view(np.uint8))
+        finally:
+            self._end_txn()
+    
+    def _send_window_9bit(self, view):
+        """Envía un paquete de _window_packet en una sola escritura de 9 bits"""
+        words = np.frombuffer(view, dtype=np.uint8).astype(np.uint16)
+        words |= _WINDOW_DC
+        
+        self._begin_txn()
+        try:
+            self.start_write(0)  # El paquete termina con Memory Write (comando)
+            self._write_block(words.view(np.uint8))
+        finally:
+            self._end_txn()
+    
     def write_cmd(self, cmd):
         """Envía un comando a la pantalla"""
-        if self.gpio_module == "RPi.GPIO":
-            self.GPIO.output(self.dc_pin, self.GPIO.LOW)  # Comando
-            self.GPIO.output(self.cs_pin, self.GPIO.LOW)  # Seleccionar chip
-            self.spi.writebytes([cmd])
-            self.GPIO.output(self.cs_pin, self.GPIO.HIGH)  # Deseleccionar chip
-            
-        elif self.gpio_module == "gpiod":
-            self.dc_line.set_value(0)  # Comando
-            self.cs_line.set_value(0)  # Seleccionar chip
-            self.spi.writebytes([cmd])
-            self.cs_line.set_value(1)  # Deseleccionar chip
-            
-        elif self.gpio_module == "lgpio":
-            self.lgpio.gpio_write(self.gpio_handle, self.dc_pin, 0)  # Comando
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 0)  # Seleccionar chip
-            self.spi.writebytes([cmd])
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 1)  # Deseleccionar chip
-            
-        elif self.gpio_module == "DUMMY":
+        if self.gpio_module == "DUMMY":
             # Modo simulación
-            pass
+            return
+        
+        self.start_write(0)  # Comando
+        self._write(_BYTE[cmd])
+        self.end_write()
     
     def write_data(self, data):
         """Envía datos a la pantalla"""
-        if self.gpio_module == "RPi.GPIO":
-            self.GPIO.output(self.dc_pin, self.GPIO.HIGH)  # Datos
-            self.GPIO.output(self.cs_pin, self.GPIO.LOW)  # Seleccionar chip
+        if self.gpio_module == "DUMMY":
+            # Modo simulación
+            return
+        
+        self.start_write(1)  # Datos
+        if isinstance(data, (bytes, bytearray)):
+            self._write(data)
+        elif isinstance(data, list):
+            self._write(bytes(data))
+        else:
+            self._write(_BYTE[data])
+        self.end_write()
+    
+    def write_cmd_data(self, cmd, data=b''):
+        """
+        Envía un comando seguido de sus parámetros con CS activo en ambos
+        
+        Args:
+            cmd (int): Byte de comando
+            data (bytes): Parámetros del comando
+        """
+        self._write_seq(((0, _BYTE[cmd]), (1, data)))
+    
+    def write_pixels(self, buf):
+        """
+        Envía un buffer de datos ya preparado tras start_write()
+        
+        Args:
+            buf: bytes, bytearray, memoryview o lista de bytes
+        """
+        if isinstance(buf, list):
+            # Las listas se convierten una vez aquí para que el bus solo
+            # reciba objetos con protocolo de buffer
+            buf = bytes(buf)
+        self._write(buf)
+    
+    def write_color(self, color, pixel_count):
+        """
+        Envía pixel_count píxeles de un mismo color tras start_write()
+        
+        Usa los bloques de color cacheados de la pantalla, sin construir
+        buffers nuevos en cada llamada.
+        
+        Args:
+            color (int): Color en formato RGB565
+            pixel_count (int): Número de píxeles a enviar
+        """
+        self._write_color(color, pixel_count)
+    
+    def start_write(self, dc=1):
+        """
+        Prepara la siguiente escritura SPI con DC en el nivel indicado
+        
+        Si el chip no está seleccionado, fija DC y CS a la vez; dentro de
+        una transacción (_begin_txn) solo se conmuta DC si cambia de nivel.
+        
+        Args:
+            dc (int): 0 para comandos, 1 para datos
+        """
+        if not self._selected:
+            self._select(dc)
+            self._selected = True
+        elif dc != self._dc_level:
+            self._set_dc(dc)
+        self._dc_level = dc
+    
+    def end_write(self):
+        """Deselecciona el chip al terminar una escritura fuera de transacción"""
+        if not self._txn_depth and self._selected:
+            self._deselect()
+            self._selected = False
+    
+    def _begin_txn(self):
+        """
+        Abre una transacción: CS queda activo hasta el _end_txn correspondiente
+        
+        El chip se selecciona con la primera escritura de la transacción.
+        Las transacciones pueden anidarse; solo la más externa libera CS.
+        """
+        self._txn_depth += 1
+    
+    def _end_txn(self):
+        """Cierra una transacción y libera CS al salir de la más externa"""
+        self._txn_depth -= 1
+        self.end_write()
+    
+    @contextmanager
+    def begin_data(self):
+        """
+        Mantiene el chip seleccionado durante un bloque de dibujo
+        
+        Las primitivas llamadas dentro del bloque comparten una sola
+        selección de CS: entre ellas solo se conmuta DC. Los bloques pueden
+        anidarse.
+        
+        Ejemplo:
+            with display.begin_data():
+                graphics.draw_text(10, 10, "Hola")
+                graphics.draw_rectangle(0, 30, 100, 2, WHITE)
+        """
+        self._begin_txn()
+        try:
+            yield self
+        finally:
+            self._end_txn()
+    
+    def _gpiod_vals(self, vals):
+        """Adapta una lista de niveles (DC, CS, RST) a las líneas solicitadas"""
+        return [vals[i] for i in self._gpiod_cols]
+    
+    def _bind_gpio_ops(self):
+        """
+        Asigna _select, _deselect y _set_dc según el módulo GPIO activo
+        
+        La elección se hace una sola vez; cada operación es una función con
+        los pines y las funciones del módulo ya capturados, sin comparar
+        self.gpio_module en cada cambio de DC o CS. Con gpiod, DC y CS se
+        actualizan con una única llamada set_values(). _set_dc solo se usa
+        con el chip seleccionado.
+        """
+        dc_pin, cs_pin = self.dc_pin, self.cs_pin
+        
+        if self._rio is not None:
+            gpio_set, gpio_clr = self._rio.setter(), self._rio.clearer()
+            dc_mask, cs_mask = self._dc_mask, self._cs_mask
             
-            if isinstance(data, list):
-                self.spi.writebytes(data)
-            else:
-                self.spi.writebytes([data])
-                
-            self.GPIO.output(self.cs_pin, self.GPIO.HIGH)  # Deseleccionar chip
+            def select(dc):
+                if dc:
+                    gpio_set(dc_mask)
+                    gpio_clr(cs_mask)
+                else:
+                    gpio_clr(dc_mask | cs_mask)
+            
+            def deselect():
+                gpio_set(cs_mask)
+            
+            def set_dc(level):
+                (gpio_set if level else gpio_clr)(dc_mask)
+            
+        elif self.gpio_module == "RPi.GPIO":
+            output, low, high = self.GPIO.output, self.GPIO.LOW, self.GPIO.HIGH
+            
+            def select(dc):
+                output(dc_pin, dc)
+                output(cs_pin, low)
+            
+            def deselect():
+                output(cs_pin, high)
+            
+            def set_dc(level):
+                output(dc_pin, level)
             
         elif self.gpio_module == "gpiod":
-            self.dc_line.set_value(1)  # Datos
-            self.cs_line.set_value(0)  # Seleccionar chip
+            set_values = self.lines.set_values
+            cmd_vals, data_vals, idle_vals = (self._gpiod_vals(v) for v in
+                                              (_CMD_SELECT, _DATA_SELECT, _IDLE))
             
-            if isinstance(data, list):
-                self.spi.writebytes(data)
-            else:
-                self.spi.writebytes([data])
-                
-            self.cs_line.set_value(1)  # Deseleccionar chip
+            def select(dc):
+                set_values(data_vals if dc else cmd_vals)
+            
+            def deselect():
+                set_values(idle_vals)
+            
+            # Con CS activo, cambiar DC es volver a seleccionar
+            set_dc = select
             
         elif self.gpio_module == "lgpio":
-            self.lgpio.gpio_write(self.gpio_handle, self.dc_pin, 1)  # Datos
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 0)  # Seleccionar chip
+            write, handle = self.lgpio.gpio_write, self.gpio_handle
             
-            if isinstance(data, list):
-                self.spi.writebytes(data)
-            else:
-                self.spi.writebytes([data])
-                
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 1)  # Deseleccionar chip
+            def select(dc):
+                write(handle, dc_pin, dc)
+                write(handle, cs_pin, 0)
             
-        elif self.gpio_module == "DUMMY":
+            def deselect():
+                write(handle, cs_pin, 1)
+            
+            def set_dc(level):
+                write(handle, dc_pin, level)
+            
+        else:
             # Modo simulación
-            pass
+            select = deselect = set_dc = _noop
+        
+        if self.cs_pin is None:
+            # CS gestionado por spidev en cada transferencia: solo queda DC
+            deselect = _noop
+            select = set_dc
+        
+        self._select = select
+        self._deselect = deselect
+        self._set_dc = set_dc
+    
+    def _write_seq(self, seq):
+        """
+        Envía una secuencia de comandos y datos en una sola transacción
+        
+        Solo conmuta DC cuando cambia respecto al bloque anterior y agrupa
+        los bloques consecutivos con el mismo nivel en una única escritura SPI.
+        
+        Args:
+            seq: Secuencia de tuplas (dc, bytes), con dc=0 comando y dc=1 datos
+        """
+        if self.gpio_module == "DUMMY":
+            return
+        
+        self._begin_txn()
+        try:
+            dc = None
+            buf = bytearray()
+            for level, data in seq:
+                if level != dc:
+                    if buf:
+                        self._write(buf)
+                        buf = bytearray()
+                    self.start_write(level)
+                    dc = level
+                buf += data
+            if buf:
+                self._write(buf)
+        finally:
+            self._end_txn()
     
     def reset(self):
         """Resetea la pantalla mediante el pin de reset"""
-        print("Reseteando pantalla...")
+        logger.debug("Reseteando pantalla...")
+        self.flush()
         
         if self.gpio_module == "RPi.GPIO":
             self.GPIO.output(self.rst_pin, self.GPIO.HIGH)
@@ -274,11 +812,11 @@ class ST7796:
             self.GPIO.output(self.rst_pin, self.GPIO.HIGH)
             
         elif self.gpio_module == "gpiod":
-            self.rst_line.set_value(1)
+            self.lines.set_values(self._gpiod_vals(_IDLE))
             time.sleep(0.05)
-            self.rst_line.set_value(0)
+            self.lines.set_values(self._gpiod_vals(_RESET))
             time.sleep(0.1)
-            self.rst_line.set_value(1)
+            self.lines.set_values(self._gpiod_vals(_IDLE))
             
         elif self.gpio_module == "lgpio":
             self.lgpio.gpio_write(self.gpio_handle, self.rst_pin, 1)
@@ -295,101 +833,23 @@ class ST7796:
     
     def _init_display(self):
         """Inicializa la pantalla con la secuencia para ST7796"""
-        print("Inicializando ST7796...")
-        
-        # Sleep Out
-        self.write_cmd(0x11)
-        time.sleep(0.12)
-        
-        # Configuración básica de la pantalla
-        self.write_cmd(0x36)
-        self.write_data(0x48)
-        
-        self.write_cmd(0x3A)
-        self.write_data(0x55)  # 16 bits por pixel (RGB565)
-        
-        # Secuencia de inicialización para ST7796
-        self.write_cmd(0xF0)
-        self.write_data(0xC3)
-        
-        self.write_cmd(0xF0)
-        self.write_data(0x96)
-        
-        self.write_cmd(0xB4)
-        self.write_data(0x02)
-        
-        self.write_cmd(0xB7)
-        self.write_data(0xC6)
-        
-        self.write_cmd(0xC0)
-        self.write_data(0xC0)
-        self.write_data(0x00)
-        
-        self.write_cmd(0xC1)
-        self.write_data(0x13)
-        
-        self.write_cmd(0xC2)
-        self.write_data(0xA7)
-        
-        self.write_cmd(0xC5)
-        self.write_data(0x21)
-        
-        self.write_cmd(0xE8)
-        self.write_data(0x40)
-        self.write_data(0x8A)
-        self.write_data(0x1B)
-        self.write_data(0x1B)
-        self.write_data(0x23)
-        self.write_data(0x0A)
-        self.write_data(0xAC)
-        self.write_data(0x33)
-        
-        # Gamma settings
-        self.write_cmd(0xE0)  # Positive Gamma
-        self.write_data(0xD2)
-        self.write_data(0x05)
-        self.write_data(0x08)
-        self.write_data(0x06)
-        self.write_data(0x05)
-        self.write_data(0x02)
-        self.write_data(0x2A)
-        self.write_data(0x44)
-        self.write_data(0x46)
-        self.write_data(0x39)
-        self.write_data(0x15)
-        self.write_data(0x15)
-        self.write_data(0x2D)
-        self.write_data(0x32)
-        
-        self.write_cmd(0xE1)  # Negative Gamma
-        self.write_data(0x96)
-        self.write_data(0x08)
-        self.write_data(0x0C)
-        self.write_data(0x09)
-        self.write_data(0x09)
-        self.write_data(0x25)
-        self.write_data(0x2E)
-        self.write_data(0x43)
-        self.write_data(0x42)
-        self.write_data(0x35)
-        self.write_data(0x11)
-        self.write_data(0x11)
-        self.write_data(0x28)
-        self.write_data(0x2E)
-        
-        self.write_cmd(0xF0)
-        self.write_data(0x3C)
-        
-        self.write_cmd(0xF0)
-        self.write_data(0x69)
-        
-        time.sleep(0.12)
-        
-        # Encender la pantalla
-        self.write_cmd(0x21)  # Display Inversion On
-        self.write_cmd(0x29)  # Display On
-        
-        print("Inicialización completa")
+        logger.debug("Inicializando ST7796...")
+        
+        # Toda la secuencia se envía con CS activo; cada tramo entre pausas
+        # sale en un único _write_seq. Los tiempos se cuentan desde Sleep Out,
+        # así que el envío de la configuración ya cuenta como espera.
+        self._begin_txn()
+        try:
+            t0 = time.monotonic()
+            for start, run in _INIT_SCRIPT:
+                remaining = t0 + start / 1000 - time.monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+                self._write_seq(run)
+        finally:
+            self._end_txn()
+        
+        logger.debug("Inicialización completa")
     
     def set_rotation(self, rotation):
         """
@@ -403,22 +863,15 @@ class ST7796:
                 3: 270 grados
         """
         rotation = rotation % 4
-        self.write_cmd(0x36)
-        
-        if rotation == 0:  # 0 grados
-            self.write_data(0x48)
-            self.width, self.height = 320, 480
-        elif rotation == 1:  # 90 grados
-            self.write_data(0x28)
-            self.width, self.height = 480, 320
-        elif rotation == 2:  # 180 grados
-            self.write_data(0x88)
-            self.width, self.height = 320, 480
-        elif rotation == 3:  # 270 grados
-            self.write_data(0xE8)
-            self.width, self.height = 480, 320
-            
-        print(f"Pantalla configurada en rotación {rotation}, tamaño: {self.width}x{self.height}")
+        
+        madctl, self.width, self.height = _ROTATIONS[rotation]
+        self.write_cmd_data(0x36, madctl)
+        
+        # Ventana de pantalla completa precalculada para fill_screen
+        self._full_window = self._window_packet(0, 0, self.width-1, self.height-1)
+        
+        logger.debug("Pantalla configurada en rotación %d, tamaño: %dx%d",
+                     rotation, self.width, self.height)
     
     def set_address_window(self, x0, y0, x1, y1):
         """
@@ -430,42 +883,49 @@ class ST7796:
             x1 (int): Coordenada X fin
             y1 (int): Coordenada Y fin
         """
-        # Column Address Set
-        self.write_cmd(0x2A)
-        self.write_data(x0 >> 8)
-        self.write_data(x0 & 0xFF)
-        self.write_data(x1 >> 8)
-        self.write_data(x1 & 0xFF)
+        # Column Address Set, Row Address Set y Memory Write en un solo
+        # paquete empaquetado con struct
+        self._send_window(self._window_packet(x0, y0, x1, y1))
+    
+    def set_address_window_fast(self, x0, y0, x1, y1):
+        """
+        Versión optimizada de set_address_window con menos transacciones SPI
         
-        # Row Address Set
-        self.write_cmd(0x2B)
-        self.write_data(y0 >> 8)
-        self.write_data(y0 & 0xFF)
-        self.write_data(y1 >> 8)
-        self.write_data(y1 & 0xFF)
+        Los tres comandos y sus parámetros se empaquetan en un único buffer
+        de 11 bytes que se envía por tramos dentro de una transacción, de
+        modo que DC solo se conmuta en los límites comando/datos.
+        """
+        if self.gpio_module == "DUMMY":
+            # Modo simulación
+            return
         
-        # Memory Write
-        self.write_cmd(0x2C)
+        self._send_window(self._window_packet(x0, y0, x1, y1))
     
-    def set_address_window_fast(self, x0, y0, x1, y1):
-        """Versión optimizada de set_address_window con menos transacciones SPI"""
-        # Column Address Set
-        self.write_cmd(0x2A)
-        # Envía todos los datos de una sola vez
-        self.write_data([
-            x0 >> 8, x0 & 0xFF,
-            x1 >> 8, x1 & 0xFF
-        ])
-        
-        # Row Address Set
-        self.write_cmd(0x2B)
-        self.write_data([
-            y0 >> 8, y0 & 0xFF,
-            y1 >> 8, y1 & 0xFF
-        ])
-        
-        # Memory Write
-        self.write_cmd(0x2C)
+    def _set_full_window(self):
+        """Establece la ventana de pantalla completa con el paquete precalculado"""
+        self._send_window(self._full_window)
+    
+    @staticmethod
+    def _window_packet(x0, y0, x1, y1):
+        """Construye los 11 bytes de Column/Row Address Set y Memory Write"""
+        return memoryview(_pack_window(0x2A, x0, x1, 0x2B, y0, y1, 0x2C))
+    
+    def _send_window(self, view):
+        """Envía un paquete de _window_packet conmutando DC en cada tramo"""
+        self._begin_txn()
+        try:
+            self.start_write(0)
+            self._write(view[0:1])
+            self.start_write(1)
+            self._write(view[1:5])
+            self.start_write(0)
+            self._write(view[5:6])
+            self.start_write(1)
+            self._write(view[6:10])
+            self.start_write(0)
+            self._write(view[10:11])
+        finally:
+            self._end_txn()
     
     def fill_screen(self, color):
         """
@@ -474,48 +934,95 @@ class ST7796:
         Args:
             color (int): Color en formato RGB565
         """
-        self.set_address_window(0, 0, self.width-1, self.height-1)
-        
-        # Preparar color
-        color_high = (color >> 8) & 0xFF
-        color_low = color & 0xFF
-        
         if self.gpio_module == "DUMMY":
             # Modo simulación
             print(f"Simulación: Pantalla llena con color 0x{color:04X}")
             return
         
-        # Configurar para envío de datos
-        if self.gpio_module == "RPi.GPIO":
-            self.GPIO.output(self.dc_pin, self.GPIO.HIGH)  # Datos
-            self.GPIO.output(self.cs_pin, self.GPIO.LOW)   # Seleccionar chip
-        elif self.gpio_module == "gpiod":
-            self.dc_line.set_value(1)  # Datos
-            self.cs_line.set_value(0)  # Seleccionar chip
-        elif self.gpio_module == "lgpio":
-            self.lgpio.gpio_write(self.gpio_handle, self.dc_pin, 1)  # Datos
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 0)  # Seleccionar chip
+        # CS activo desde la ventana de direcciones hasta el último píxel
+        self._begin_txn()
+        try:
+            self._set_full_window()
+            
+            # Configurar para envío de datos
+            self.start_write(1)
+            
+            # Enviamos el color en bloques del tamaño máximo admitido por spidev
+            self._write_color(color, self.width * self.height)
+        finally:
+            self._end_txn()
+    
+    def _color_block(self, color):
+        """
+        Devuelve un bloque de self._spi_chunk bytes relleno con un color
+        
+        Los bloques se guardan por color, así que los colores habituales
+        (fondos, cabeceras) no se reconstruyen en cada relleno. La caché
+        conserva como máximo COLOR_CACHE_SIZE colores.
+        
+        Args:
+            color (int): Color en formato RGB565
+        
+        Returns:
+            memoryview: Vista de solo lectura sobre el bloque de color
+        """
+        block = self._color_buf_cache.get(color)
+        if block is None:
+            if len(self._color_buf_cache) >= COLOR_CACHE_SIZE:
+                # Descartar el color más antiguo
+                del self._color_buf_cache[next(iter(self._color_buf_cache))]
+            # Relleno vectorizado en big-endian, el orden de bytes del bus
+            pixels = np.full(self._spi_chunk // self._wire_bpp, color, dtype='>u2')
+            if self._wire_bpp == 4:
+                # Cada byte como palabra de 9 bits nativa con DC=1
+                pixels = pixels.view(np.uint8).astype(np.uint16) | 0x100
+            pixels.flags.writeable = False
+            block = memoryview(pixels.view(np.uint8))
+            self._color_buf_cache[color] = block
+        return block
+    
+    def _write_color(self, color, pixel_count):
+        """
+        Envía pixel_count píxeles de un mismo color con el chip ya seleccionado
         
-        # Enviamos el color en bloques para mayor eficiencia
-        buffer_size = 1024
-        buffer = [color_high, color_low] * (buffer_size // 2)
+        El bloque de color sale de la caché de _color_block. Si hacen falta
+        varios bloques, se entregan todos en una sola llamada os.writev()
+        sobre el descriptor de spidev: el kernel pasa cada iovec al driver
+        como una transferencia larga (atendida por DMA), sin volver a
+        Python entre bloques.
         
-        pixels = self.width * self.height
-        for i in range(pixels // (buffer_size // 2)):
-            self.spi.writebytes(buffer)
+        Ningún relleno construye un buffer de su tamaño: incluso la pantalla
+        completa repite el mismo bloque en la lista de iovec.
+        
+        Args:
+            color (int): Color en formato RGB565
+            pixel_count (int): Número de píxeles a enviar
+        """
+        view = self._color_block(color)
+        bpp = self._wire_bpp
+        full_blocks, remainder = divmod(pixel_count, len(view) // bpp)
         
-        remaining = pixels % (buffer_size // 2)
-        if remaining > 0:
-            buffer = [color_high, color_low] * remaining
-            self.spi.writebytes(buffer)
+        # El resto es un fragmento del mismo bloque
+        iov = [view] * full_blocks
+        if remainder:
+            iov.append(view[:remainder * bpp])
         
-        # Deseleccionar chip
-        if self.gpio_module == "RPi.GPIO":
-            self.GPIO.output(self.cs_pin, self.GPIO.HIGH)
-        elif self.gpio_module == "gpiod":
-            self.cs_line.set_value(1)
-        elif self.gpio_module == "lgpio":
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 1)
+        if len(iov) == 1:
+            self._write_block(iov[0])
+        else:
+            self._writev(iov)
+    
+    def _writev(self, iov):
+        """
+        Escribe una lista de buffers en el descriptor de spidev con os.writev
+        
+        Cada iovec es una transferencia de hasta bufsiz bytes. Un único
+        SPI_IOC_MESSAGE con varios segmentos no enviaría más por llamada:
+        spidev limita a bufsiz la suma de los segmentos de un mensaje.
+        """
+        fd = self.spi.fileno()
+        for start in range(0, len(iov), _IOV_MAX):
+            os.writev(fd, iov[start:start + _IOV_MAX])
     
     def draw_pixel(self, x, y, color):
         """
@@ -526,35 +1033,187 @@ class ST7796:
             y (int): Coordenada Y
             color (int): Color en formato RGB565
         """
-        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+        # Algún término es negativo si el píxel está fuera de la pantalla
+        if (x | y | (self.width - 1 - x) | (self.height - 1 - y)) < 0:
             return  # Fuera de los límites
-            
-        self.set_address_window(x, y, x, y)
         
         # Modo simulación
         if self.gpio_module == "DUMMY":
             return
         
-        # Enviar color según el módulo GPIO
-        if self.gpio_module == "RPi.GPIO":
-            self.GPIO.output(self.dc_pin, self.GPIO.HIGH)  # Datos
-            self.GPIO.output(self.cs_pin, self.GPIO.LOW)   # Seleccionar chip
-            self.spi.writebytes([(color >> 8) & 0xFF, color & 0xFF])
-            self.GPIO.output(self.cs_pin, self.GPIO.HIGH)  # Deseleccionar chip
-        elif self.gpio_module == "gpiod":
-            self.dc_line.set_value(1)  # Datos
-            self.cs_line.set_value(0)  # Seleccionar chip
-            self.spi.writebytes([(color >> 8) & 0xFF, color & 0xFF])
-            self.cs_line.set_value(1)  # Deseleccionar chip
-        elif self.gpio_module == "lgpio":
-            self.lgpio.gpio_write(self.gpio_handle, self.dc_pin, 1)  # Datos
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 0)  # Seleccionar chip
-            self.spi.writebytes([(color >> 8) & 0xFF, color & 0xFF])
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 1)  # Deseleccionar chip
+        self._begin_txn()
+        try:
+            self.set_address_window(x, y, x, y)
+            
+            # Enviar color: reutilizar el bloque cacheado si ya existe
+            block = self._color_buf_cache.get(color)
+            self.start_write(1)
+            if block is not None:
+                self._write_block(block[:self._wire_bpp])
+            else:
+                self._write(_pack_pixel(color & 0xFFFF))
+        finally:
+            self._end_txn()
 
+    def blit_rgb565(self, x, y, arr):
+        """
+        Copia una imagen a la pantalla en una sola escritura
+        
+        La conversión a big-endian (y desde RGB888 si hace falta) se hace
+        con NumPy; la parte que queda fuera de la pantalla se recorta.
+        
+        Args:
+            x (int): Coordenada X de la esquina superior izquierda
+            y (int): Coordenada Y de la esquina superior izquierda
+            arr (numpy.ndarray): Imagen (alto, ancho) en RGB565 o
+                (alto, ancho, 3) en RGB888
+        """
+        arr = np.asarray(arr)
+        if arr.ndim == 3:
+            arr = rgb888_to_rgb565(arr)
+        elif arr.ndim != 2:
+            raise ValueError("La imagen debe ser (alto, ancho) o (alto, ancho, 3)")
+        
+        height, width = arr.shape
+        clip = self._clip_rect(x, y, width, height)
+        if clip is None:
+            return
+        
+        # Recortar el array a la zona visible
+        cx, cy, width, height = clip
+        arr = arr[cy - y:cy - y + height, cx - x:cx - x + width]
+        
+        # Modo simulación
+        if self.gpio_module == "DUMMY":
+            print(f"Simulación: Imagen en ({cx},{cy}) tamaño {width}x{height}")
+            return
+        
+        # Bytes en el orden del bus; spidev los trocea según bufsiz
+        data = np.ascontiguousarray(arr, dtype='>u2').tobytes()
+        
+        self._begin_txn()
+        try:
+            self.set_address_window_fast(cx, cy, cx+width-1, cy+height-1)
+            self.start_write(1)
+            self._write(data)
+        finally:
+            self._end_txn()
+    
+    def draw_pixels(self, xs, ys, colors):
+        """
+        Dibuja muchos píxeles agrupados en tramos horizontales
+        
+        Los píxeles se ordenan por fila y columna; cada tramo de píxeles
+        contiguos de una misma fila se envía con una ventana de direcciones
+        y una sola escritura, en lugar de una ventana por píxel. Los píxeles
+        fuera de la pantalla se descartan y, si uno se repite, vale el último.
+        
+        Args:
+            xs: Coordenadas X (secuencia o numpy.ndarray)
+            ys: Coordenadas Y (secuencia o numpy.ndarray)
+            colors: Color RGB565 de cada píxel, o un único color para todos
+        """
+        xs = np.asarray(xs, dtype=np.int64).ravel()
+        ys = np.asarray(ys, dtype=np.int64).ravel()
+        colors = np.broadcast_to(np.asarray(colors, dtype=np.uint16), xs.shape)
+        
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        if not inside.any():
+            return
+        
+        # Modo simulación
+        if self.gpio_module == "DUMMY":
+            return
+        
+        # Orden estable por (y, x): los repetidos conservan el orden de entrada
+        order = np.lexsort((xs[inside], ys[inside]))
+        xs, ys, colors = xs[inside][order], ys[inside][order], colors[inside][order]
+        
+        keep = np.ones(xs.size, dtype=bool)
+        keep[:-1] = (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])
+        xs, ys, colors = xs[keep], ys[keep], colors[keep]
+        
+        # Límites de los tramos contiguos dentro de cada fila
+        breaks = np.flatnonzero((xs[1:] != xs[:-1] + 1) | (ys[1:] != ys[:-1])) + 1
+        starts = [0] + breaks.tolist()
+        ends = breaks.tolist() + [xs.size]
+        data = memoryview(colors.astype('>u2').tobytes())
+        
+        self._begin_txn()
+        try:
+            for start, end in zip(starts, ends):
+                x0, y = int(xs[start]), int(ys[start])
+                self._send_window(self._window_packet(x0, y, x0 + end - start - 1, y))
+                self.start_write(1)
+                self._write(data[start * 2:end * 2])
+        finally:
+            self._end_txn()
+    
     def draw_rectangle_optimized(self, x, y, width, height, color):
         """Versión optimizada que reduce el número de transacciones SPI"""
-        # Validar límites
+        clip = self._clip_rect(x, y, width, height)
+        if clip is None:
+            return
+        
+        # Modo simulación
+        if self.gpio_module == "DUMMY":
+            x, y, width, height = clip
+            print(f"Simulación: Rectángulo en ({x},{y}) tamaño {width}x{height} color 0x{color:04X}")
+            return
+        
+        self._fill_region(clip, color)
+    
+    def draw_rectangles(self, rects, color):
+        """
+        Dibuja varios rectángulos rellenos del mismo color
+        
+        Los rectángulos que se tocan y forman juntos un rectángulo mayor se
+        fusionan, de modo que cada región se envía con una sola ventana de
+        direcciones y una sola escritura del buffer de color.
+        
+        Args:
+            rects (list): Lista de tuplas (x, y, ancho, alto)
+            color (int): Color de relleno (RGB565)
+        """
+        regions = self._merge_rects(self._clip_rect(*r) for r in rects)
+        if not regions:
+            return
+            
+        # Modo simulación
+        if self.gpio_module == "DUMMY":
+            for x, y, width, height in regions:
+                print(f"Simulación: Rectángulo en ({x},{y}) tamaño {width}x{height} color 0x{color:04X}")
+            return
+        
+        # CS activo durante todo el lote
+        self._begin_txn()
+        try:
+            for region in regions:
+                self._fill_region(region, color)
+        finally:
+            self._end_txn()
+    
+    def _fill_region(self, region, color):
+        """
+        Rellena una región ya recortada con una ventana y un bloque de color
+        
+        Args:
+            region (tuple): (x, y, ancho, alto) dentro de la pantalla
+            color (int): Color de relleno (RGB565)
+        """
+        x, y, width, height = region
+        self._begin_txn()
+        try:
+            self._send_window(self._window_packet(x, y, x+width-1, y+height-1))
+            
+            # Enviar todos los píxeles desde el buffer de color compartido
+            self.start_write(1)
+            self._write_color(color, width * height)
+        finally:
+            self._end_txn()
+    
+    def _clip_rect(self, x, y, width, height):
+        """Recorta un rectángulo a la pantalla; devuelve None si queda vacío"""
         if x < 0:
             width += x
             x = 0
@@ -565,62 +1224,41 @@ class ST7796:
             width = self.width - x
         if y + height > self.height:
             height = self.height - y
-    
-        # Si dimensiones son inválidas, salir
-        if width <= 0 or height <= 0:
-            return
-            
-        self.set_address_window_fast(x, y, x+width-1, y+height-1)
-        
-        # Modo simulación
-        if self.gpio_module == "DUMMY":
-            print(f"Simulación: Rectángulo en ({x},{y}) tamaño {width}x{height} color 0x{color:04X}")
-            return
-        
-        # Preparar color
-        color_hi = (color >> 8) & 0xFF
-        color_lo = color & 0xFF
         
-        # Establecer pines según el módulo GPIO
-        if self.gpio_module == "RPi.GPIO":
-            self.GPIO.output(self.dc_pin, self.GPIO.HIGH)  # Datos
-            self.GPIO.output(self.cs_pin, self.GPIO.LOW)   # Seleccionar chip
-        elif self.gpio_module == "gpiod":
-            self.dc_line.set_value(1)  # Datos
-            self.cs_line.set_value(0)  # Seleccionar chip
-        elif self.gpio_module == "lgpio":
-            self.lgpio.gpio_write(self.gpio_handle, self.dc_pin, 1)  # Datos
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 0)  # Seleccionar chip
+        if width <= 0 or height <= 0:
+            return None
+        return (x, y, width, height)
+    
+    @staticmethod
+    def _merge_rects(rects):
+        """
+        Fusiona rectángulos contiguos o solapados cuya unión es un rectángulo
         
-        # Crear un buffer único para toda la operación
-        pixel_count = width * height
+        Primero se unen tramos de la misma fila (mismo y y alto) y después
+        bloques de la misma columna (mismo x y ancho).
+        """
+        # Tramos horizontales: misma fila, ordenados por (y, alto, x)
+        rows = []
+        for y, h, x, w in sorted((r[1], r[3], r[0], r[2]) for r in rects if r is not None):
+            if rows:
+                py, ph, px, pw = rows[-1]
+                if py == y and ph == h and x <= px + pw:
+                    rows[-1] = (py, ph, px, max(px + pw, x + w) - px)
+                    continue
+            rows.append((y, h, x, w))
         
-        # Para rectángulos grandes, usar buffers de tamaño fijo
-        if pixel_count > 1024:
-            buffer = [color_hi, color_lo] * 512  # 1024 bytes
-            full_writes = pixel_count // 512
-            remainder = pixel_count % 512
-            
-            # Enviar bloques completos
-            for _ in range(full_writes):
-                self.spi.writebytes(buffer)
-            
-            # Enviar el resto
-            if remainder > 0:
-                self.spi.writebytes([color_hi, color_lo] * remainder)
-        else:
-            # Para rectángulos pequeños, un solo buffer
-            buffer = [color_hi, color_lo] * pixel_count
-            self.spi.writebytes(buffer)
+        # Bloques verticales: misma columna, ordenados por (x, ancho, y)
+        cols = []
+        for x, w, y, h in sorted((r[2], r[3], r[0], r[1]) for r in rows):
+            if cols:
+                px, pw, py, ph = cols[-1]
+                if px == x and pw == w and y <= py + ph:
+                    cols[-1] = (px, pw, py, max(py + ph, y + h) - py)
+                    continue
+            cols.append((x, w, y, h))
         
-        # Deseleccionar chip según el módulo GPIO
-        if self.gpio_module == "RPi.GPIO":
-            self.GPIO.output(self.cs_pin, self.GPIO.HIGH)
-        elif self.gpio_module == "gpiod":
-            self.cs_line.set_value(1)
-        elif self.gpio_module == "lgpio":
-            self.lgpio.gpio_write(self.gpio_handle, self.cs_pin, 1)
-
+        return [(x, y, w, h) for x, w, y, h in cols]
+    
     def close(self):
         """Libera los recursos utilizados"""
         try:
@@ -628,19 +1266,29 @@ class ST7796:
                 print("Simulación: Recursos liberados")
                 return
                 
+            if self._async:
+                # Vaciar la cola y detener el hilo escritor
+                self._spi_q.put((None, ()))
+                self._writer.join()
+                self._async = False
+            
             if hasattr(self, 'spi'):
                 self.spi.close()
+            
+            if self._rio is not None:
+                self._rio.close()
+                self._rio = None
                 
             if self.gpio_module == "RPi.GPIO":
-                self.GPIO.cleanup([self.dc_pin, self.rst_pin, self.cs_pin])
+                self.GPIO.cleanup([pin for pin in (self.dc_pin, self.rst_pin, self.cs_pin)
+                                   if pin is not None])
             elif self.gpio_module == "gpiod":
-                self.dc_line.release()
-                self.rst_line.release()
-                self.cs_line.release()
+                self.lines.release()
             elif self.gpio_module == "lgpio":
                 self.lgpio.gpio_free(self.gpio_handle, self.dc_pin)
                 self.lgpio.gpio_free(self.gpio_handle, self.rst_pin)
-                self.lgpio.gpio_free(self.gpio_handle, self.cs_pin)
+                if self.cs_pin is not None:
+                    self.lgpio.gpio_free(self.gpio_handle, self.cs_pin)
                 self.lgpio.gpiochip_close(self.gpio_handle)
                 
             print("Recursos liberados correctamente")
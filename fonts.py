@@ -1,6 +1,7 @@
 """
 Definición de fuentes para usar con la pantalla ST7796
 """
+import numpy as np
 
 # Fuente básica de 8x8 píxeles
 FONT_8x8 = {
@@ -69,4 +70,24 @@ FONT_8x8 = {
     '¡': [0x04, 0x00, 0x04, 0x04, 0x04, 0x04, 0x04, 0x00],
     '¿': [0x04, 0x00, 0x04, 0x08, 0x10, 0x11, 0x0E, 0x00],
     '°': [0x0E, 0x11, 0x11, 0x0E, 0x00, 0x00, 0x00, 0x00]
-}
\ No newline at end of file
+}
+
+def _build_font_table(font):
+    """
+    Convierte la fuente en una tabla indexada por código Latin-1
+    
+    Cada código c se dibuja como chr(c).upper() si ese carácter está en la
+    fuente y como '?' en caso contrario, así que la normalización se hace
+    aquí una sola vez y no en cada carácter dibujado.
+    """
+    table = np.empty((256, 8), dtype=np.uint8)
+    for code in range(256):
+        table[code] = font.get(chr(code).upper(), font['?'])
+    table.flags.writeable = False
+    return table
+
+# Filas de bits de FONT_8x8 indexadas por ord(carácter) (0-255)
+FONT_TABLE = _build_font_table(FONT_8x8)
+
+# Índice de FONT_TABLE usado para caracteres fuera de Latin-1
+FONT_FALLBACK = ord('?')
@@ -1,8 +1,11 @@
 """
 Funciones para dibujar elementos gráficos en pantallas ST7796
 """
-from .fonts import FONT_8x8
+from .fonts import FONT_TABLE, FONT_FALLBACK
+from ._raster import render_glyph as _render_glyph_jit
 from datetime import datetime
+from itertools import groupby
+import numpy as np
 
 # Definir colores (formato RGB565)
 BLACK = 0x0000
@@ -17,18 +20,151 @@ ORANGE = 0xFD20
 GRAY = 0x8410
 DARKGREEN = 0x0400
 
+# Tamaño de cada arena de glifos renderizados (bytes)
+GLYPH_ARENA_SIZE = 256 * 1024
+
+# Máscaras 8x8 de FONT_TABLE, calculadas una vez al importar: bool[256, 8, 8]
+_FONT_BITS = np.unpackbits(FONT_TABLE, axis=1).reshape(256, 8, 8).astype(bool)
+
+# Códigos de FONT_TABLE cuyo glifo no tiene ningún píxel encendido (espacios)
+_BLANK_GLYPH = tuple(not row.any() for row in FONT_TABLE)
+
+def _clip_slices(x, y, width, height, limit_width, limit_height):
+    """
+    Recorta un rectángulo a la zona [0, limit_width) x [0, limit_height)
+    
+    Returns:
+        tuple: (destino, origen), cada uno un par de slices (filas,
+            columnas) sobre la zona y sobre el rectángulo; None si no queda
+            nada visible
+    """
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + width, limit_width), min(y + height, limit_height)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return ((slice(y0, y1), slice(x0, x1)),
+            (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)))
+
+def _font_code(char):
+    """Devuelve el índice de FONT_TABLE con el que se dibuja char"""
+    code = ord(char)
+    return code if code < 256 else FONT_FALLBACK
+
+def _render_glyph(code, color, bg_color):
+    """
+    Renderiza un carácter de FONT_TABLE a tamaño 1 con NumPy
+    
+    Args:
+        code (int): Índice del carácter en FONT_TABLE
+        color (int): Color del texto (RGB565)
+        bg_color (int): Color de fondo (RGB565)
+        
+    Returns:
+        bytes: 8x8 píxeles en big-endian
+    """
+    return np.where(_FONT_BITS[code], color, bg_color).astype('>u2').tobytes()
+
 class Graphics:
     """
     Clase para funciones de dibujo en pantallas ST7796
     
     Args:
         display: Instancia de ST7796
+        framebuffer (bool): Dibujar en un framebuffer en memoria que se envía
+            a la pantalla con present(), en lugar de enviar cada primitiva
+        glyph_cache_size (int): Bytes de glifos renderizados que se guardan;
+            al llenarse se descartan todos y se vuelven a renderizar
     """
-    def __init__(self, display):
+    def __init__(self, display, framebuffer=False, glyph_cache_size=GLYPH_ARENA_SIZE):
         self.display = display
-        self.char_buffer_cache = {}
+        
+        # Framebuffer RGB565 (alto, ancho) o None si se dibuja directamente
+        self.fb = None
+        if framebuffer:
+            self.fb = np.zeros((display.height, display.width), dtype=np.uint16)
+        
+        # Glifos renderizados, contiguos en una arena: {clave: memoryview}.
+        # La memoria queda acotada por el tamaño de la arena
+        self._glyph_arena_size = glyph_cache_size
+        self._glyph_index = {}
+        self._new_glyph_arena(glyph_cache_size)
+        
+        # Último pie de página dibujado: (disposición y colores, fecha, hora)
+        self._last_footer = (None, None, None)
+    
+    def present(self):
+        """
+        Envía el framebuffer completo a la pantalla con una sola ventana
+        
+        Solo tiene efecto si Graphics se creó con framebuffer=True.
+        """
+        if self.fb is not None:
+            self._fit_fb()
+            self.display.blit_rgb565(0, 0, self.fb)
+    
+    def _fit_fb(self):
+        """
+        Ajusta el framebuffer al tamaño actual de la pantalla
+        
+        Tras set_rotation() el ancho y el alto se intercambian; el
+        framebuffer se vuelve a reservar (en negro) con la nueva forma.
+        """
+        shape = (self.display.height, self.display.width)
+        if self.fb.shape != shape:
+            self.fb = np.zeros(shape, dtype=np.uint16)
+    
+    def _fb_clip(self, x, y, width, height):
+        """Recorta un rectángulo a los límites del framebuffer (ver _clip_slices)"""
+        self._fit_fb()
+        fb_height, fb_width = self.fb.shape
+        return _clip_slices(x, y, width, height, fb_width, fb_height)
+    
+    def _new_glyph_arena(self, size):
+        """
+        Empieza una arena de glifos vacía
+        
+        La arena anterior no se reutiliza ni se redimensiona: las vistas que
+        aún la referencian (por ejemplo, escrituras asíncronas pendientes)
+        siguen siendo válidas hasta que se liberan.
+        """
+        self._glyph_arena = memoryview(bytearray(size))
+        self._glyph_used = 0
+        self._glyph_index.clear()
+    
+    def _glyph(self, code, color, bg_color, size):
+        """
+        Devuelve los píxeles de un glifo como vista sobre la arena
+        
+        Los glifos se renderizan una vez y se copian al final de la arena;
+        cuando no cabe uno nuevo se empieza otra arena y los glifos se
+        vuelven a renderizar según se usan. Con Numba el núcleo compilado
+        genera cualquier tamaño; sin Numba los tamaños mayores que 1 se
+        obtienen escalando el glifo de tamaño 1 con los mismos colores.
+        """
+        key = (code, color, bg_color, size)
+        view = self._glyph_index.get(key)
+        if view is None:
+            if _render_glyph_jit is not None:
+                data = _render_glyph_jit(code, color, bg_color, size)
+            elif size > 1:
+                # Cada píxel de 2 bytes se repite tal cual, sin recalcular colores
+                base = np.frombuffer(self._glyph(code, color, bg_color, 1), dtype=np.uint16)
+                data = base.reshape(8, 8).repeat(size, axis=0).repeat(size, axis=1).tobytes()
+            else:
+                data = _render_glyph(code, color, bg_color)
+            start = self._glyph_used
+            end = start + len(data)
+            if end > len(self._glyph_arena):
+                self._new_glyph_arena(max(self._glyph_arena_size, len(data)))
+                start, end = 0, len(data)
+            
+            view = self._glyph_arena[start:end]
+            view[:] = data
+            self._glyph_used = end
+            self._glyph_index[key] = view
+        return view
     
-    def draw_char(self, x, y, char, size=1, color=WHITE, bg_color=BLACK):
+    def draw_char(self, x, y, char, size=1, color=WHITE, bg_color=BLACK, transparent_bg=False):
         """
         Dibuja un carácter en la pantalla
         
@@ -39,61 +175,76 @@ class Graphics:
             size (int): Tamaño (1=8 píxeles, 2=16 píxeles, etc.)
             color (int): Color del texto (RGB565)
             bg_color (int): Color de fondo (RGB565)
+            transparent_bg (bool): No dibujar los caracteres en blanco
+                (espacios), dejando lo que ya hay en pantalla
+        """
+        self._draw_text_row(x, y, [_font_code(char)], size, color, bg_color, transparent_bg)
+    
+    def _draw_text_row(self, x, y, codes, size, color, bg_color, transparent_bg):
+        """
+        Dibuja una fila de caracteres ya convertidos a códigos de FONT_TABLE
+        
+        Con transparent_bg los glifos en blanco no se envían y la fila se
+        parte en tramos de caracteres visibles, uno por ventana.
+        """
+        glyph = self._glyph
+        if not transparent_bg:
+            self._blit_glyphs(x, y, [glyph(c, color, bg_color, size) for c in codes], size)
+            return
+        
+        col = 0
+        for blank, run in groupby(codes, _BLANK_GLYPH.__getitem__):
+            run = list(run)
+            if not blank:
+                self._blit_glyphs(x + col * 8 * size, y,
+                                  [glyph(c, color, bg_color, size) for c in run], size)
+            col += len(run)
+    
+    def _blit_glyphs(self, x, y, glyphs, size):
         """
-        char = char.upper()
-        if char not in FONT_8x8:
-            char = '?'
-        
-        # Solo cachear números, letras comunes y símbolos que cambian frecuentemente
-        use_cache = char in "0123456789:.%ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-        cache_key = f"{char}_{size}_{color}_{bg_color}" if use_cache else None
-        
-        # Usar caché si existe para este carácter
-        if use_cache and cache_key in self.char_buffer_cache:
-            buffer = self.char_buffer_cache[cache_key]
-            w = 8 * size
-            h = 8 * size
-            self.display.set_address_window(x, y, x+w-1, y+h-1)
-            self.display.dc_line.set_value(1)
-            self.display.cs_line.set_value(0)
-            self.display.spi.writebytes(buffer)
-            self.display.cs_line.set_value(1)
+        Envía una fila de glifos contiguos con una sola ventana de direcciones
+        
+        Args:
+            x (int): Coordenada X del primer glifo
+            y (int): Coordenada Y
+            glyphs (list): Glifos de _glyph, de izquierda a derecha
+            size (int): Tamaño de los glifos
+        """
+        if not glyphs:
             return
         
-        # Resto del código igual, pero guardando en caché al final
-        w = 8 * size
         h = 8 * size
-        self.display.set_address_window(x, y, x+w-1, y+h-1)
-        
-        self.display.dc_line.set_value(1)
-        self.display.cs_line.set_value(0)
-        
-        color_hi = (color >> 8) & 0xFF
-        color_lo = color & 0xFF
-        bg_hi = (bg_color >> 8) & 0xFF
-        bg_lo = bg_color & 0xFF
-        
-        buffer = []
-        char_data = FONT_8x8[char]
-        
-        for row in range(8):
-            row_data = char_data[row]
-            for _ in range(size):
-                row_buffer = []
-                for col in range(8):
-                    pixel_color = [color_hi, color_lo] if (row_data & (1 << (7-col))) else [bg_hi, bg_lo]
-                    row_buffer.extend(pixel_color * size)
-                buffer.extend(row_buffer)
-        
-        # Enviar buffer
-        self.display.spi.writebytes(buffer)
-        self.display.cs_line.set_value(1)
-        
-        # Guardar en caché si es un carácter frecuente
-        if use_cache:
-            self.char_buffer_cache[cache_key] = buffer.copy()
+        w = h * len(glyphs)
+        if self.fb is not None:
+            clip = self._fb_clip(x, y, w, h)
+            if clip is not None:
+                dst, src = clip
+                pixels = np.concatenate(
+                    [np.frombuffer(g, dtype='>u2').reshape(h, h) for g in glyphs], axis=1)
+                self.fb[dst] = pixels[src]
+            return
+        
+        # La ventana solo cubre la parte visible de la fila
+        clip = _clip_slices(x, y, w, h, self.display.width, self.display.height)
+        if clip is None:
+            return
+        (rows, cols), src = clip
+        
+        if len(glyphs) == 1 and src == (slice(0, h), slice(0, w)):
+            pixels = glyphs[0]
+        else:
+            # Las filas de todos los glifos se intercalan en un solo buffer,
+            # recortado a la zona visible
+            pixels = np.concatenate(
+                [np.frombuffer(g, dtype=np.uint16).reshape(h, h) for g in glyphs], axis=1)
+            pixels = np.ascontiguousarray(pixels[src]).view(np.uint8)
+        
+        with self.display.begin_data():
+            self.display.set_address_window_fast(cols.start, rows.start, cols.stop-1, rows.stop-1)
+            self.display.start_write()
+            self.display.write_pixels(pixels)
     
-    def draw_text(self, x, y, text, size=1, color=WHITE, bg_color=BLACK):
+    def draw_text(self, x, y, text, size=1, color=WHITE, bg_color=BLACK, transparent_bg=False):
         """
         Dibuja texto en la pantalla
         
@@ -104,23 +255,30 @@ class Graphics:
             size (int): Tamaño (1=8 píxeles, 2=16 píxeles, etc.)
             color (int): Color del texto (RGB565)
             bg_color (int): Color de fondo (RGB565)
+            transparent_bg (bool): No dibujar los caracteres en blanco
+                (espacios), dejando lo que ya hay en pantalla
         """
-        cursor_x = x
-        cursor_y = y
         char_w = 8 * size
+        cursor_y = y
         
-        for char in text:
-            if char == '\n':  # Nueva línea
-                cursor_y += 8 * size
-                cursor_x = x
-            else:
-                self.draw_char(cursor_x, cursor_y, char, size, color, bg_color)
-                cursor_x += char_w
+        # Caracteres que caben en una fila antes de saltar a la siguiente
+        # (siempre al menos uno, como si el primero se dibujara sin comprobar)
+        per_line = max(1, (self.display.width - x) // char_w)
+        
+        # Todas las filas con CS activo; entre ellas solo se conmuta DC
+        with self.display.begin_data():
+            for i, line in enumerate(text.split('\n')):
+                if i:  # Nueva línea
+                    cursor_y += char_w
                 
-                # Comprobar si el siguiente carácter se sale de la pantalla
-                if cursor_x > self.display.width - char_w:
-                    cursor_y += 8 * size
-                    cursor_x = x
+                # Cada fila se envía con una sola ventana; una fila llena salta
+                # a la siguiente aunque no queden más caracteres
+                for start in range(0, len(line), per_line):
+                    row = line[start:start + per_line]
+                    self._draw_text_row(x, cursor_y, [_font_code(c) for c in row],
+                                        size, color, bg_color, transparent_bg)
+                    if len(row) == per_line:
+                        cursor_y += char_w
     
     def draw_centered_text(self, text, y, size=1, color=WHITE, bg_color=BLACK):
         """
@@ -148,107 +306,19 @@ class Graphics:
             height (int): Alto del rectángulo
             color (int): Color del rectángulo (RGB565)
         """
-        # Validar límites
-        if x < 0:
-            width += x
-            x = 0
-        if y < 0:
-            height += y
-            y = 0
-        if x + width > self.display.width:
-            width = self.display.width - x
-        if y + height > self.display.height:
-            height = self.display.height - y
-        
-        # Si dimensiones son inválidas, salir
-        if width <= 0 or height <= 0:
+        if self.fb is not None:
+            clip = self._fb_clip(x, y, width, height)
+            if clip is not None:
+                self.fb[clip[0]] = color
             return
-            
-        self.display.set_address_window(x, y, x+width-1, y+height-1)
         
-        # Preparar color
-        color_hi = (color >> 8) & 0xFF
-        color_lo = color & 0xFF
-        
-        # Enviar color repetidamente
-        self.display.dc_line.set_value(1)
-        self.display.cs_line.set_value(0)
-        
-        # Para rectangulos grandes, enviar en bloques para mejorar eficiencia
-        if width * height > 100:
-            buffer_size = min(1024, width * height)
-            buffer = [color_hi, color_lo] * (buffer_size // 2)
-            
-            pixels = width * height
-            for i in range(pixels // (buffer_size // 2)):
-                self.display.spi.writebytes(buffer)
-            
-            remaining = pixels % (buffer_size // 2)
-            if remaining > 0:
-                buffer = [color_hi, color_lo] * remaining
-                self.display.spi.writebytes(buffer)
-        else:
-            # Para rectangulos pequeños, enviar directamente
-            for _ in range(width * height):
-                self.display.spi.writebytes([color_hi, color_lo])
-        
-        self.display.cs_line.set_value(1)
+        # Recorte y envío en una sola ráfaga: ventana de direcciones y
+        # bloques de color cacheados de la pantalla
+        self.display.draw_rectangle_optimized(x, y, width, height, color)
     
     def draw_rectangle_fast(self, x, y, width, height, color):
-        """Versión acelerada de draw_rectangle usando implementación optimizada"""
-        # Validar límites de pantalla
-        if x < 0:
-            width += x
-            x = 0
-        if y < 0:
-            height += y
-            y = 0
-        if x + width > self.display.width:
-            width = self.display.width - x
-        if y + height > self.display.height:
-            height = self.display.height - y
-        
-        # Si dimensiones son inválidas, salir
-        if width <= 0 or height <= 0:
-            return
-            
-        # Usar una ventana de direcciones única para todo el rectángulo
-        self.display.set_address_window(x, y, x+width-1, y+height-1)
-        
-        # Preparar color
-        color_hi = (color >> 8) & 0xFF
-        color_lo = color & 0xFF
-        
-        # Configurar para envío de datos
-        self.display.dc_line.set_value(1)
-        self.display.cs_line.set_value(0)
-        
-        # Calcular número total de píxeles
-        num_pixels = width * height
-        
-        # Para áreas grandes, enviar en bloques para eficiencia
-        if num_pixels > 512:
-            # Crear un buffer de tamaño fijo
-            buffer = [color_hi, color_lo] * 512
-            
-            # Cuántas veces enviar el buffer completo
-            full_blocks = num_pixels // 512
-            # Cuántos píxeles quedan al final
-            remaining = num_pixels % 512
-            
-            # Enviar bloques completos
-            for _ in range(full_blocks):
-                self.display.spi.writebytes(buffer)
-            
-            # Enviar píxeles restantes
-            if remaining > 0:
-                self.display.spi.writebytes([color_hi, color_lo] * remaining)
-        else:
-            # Para áreas pequeñas, enviar todo de una vez
-            self.display.spi.writebytes([color_hi, color_lo] * num_pixels)
-        
-        # Finalizar transacción
-        self.display.cs_line.set_value(1)
+        """Alias de draw_rectangle, que ya envía el rectángulo en una sola ráfaga"""
+        self.draw_rectangle(x, y, width, height, color)
 
     def draw_text_fast(self, x, y, text, size=1, color=WHITE, bg_color=BLACK):
         """
@@ -283,11 +353,18 @@ class Graphics:
     
     def draw_horizontal_line(self, x, y, width, color):
         """Dibuja una línea horizontal optimizada"""
-        self.draw_rectangle_fast(x, y, width, 1, color)
+        if self.fb is not None:
+            self.draw_rectangle(x, y, width, 1, color)
+        else:
+            # Directamente al relleno de la pantalla, que recorta la línea
+            self.display.draw_rectangle_optimized(x, y, width, 1, color)
     
     def draw_vertical_line(self, x, y, height, color):
         """Dibuja una línea vertical optimizada"""
-        self.draw_rectangle_fast(x, y, 1, height, color)
+        if self.fb is not None:
+            self.draw_rectangle(x, y, 1, height, color)
+        else:
+            self.display.draw_rectangle_optimized(x, y, 1, height, color)
     
     def draw_section_title(self, x, y, title, color=YELLOW):
         """
@@ -312,40 +389,60 @@ class Graphics:
             bg_color (int): Color de fondo (RGB565)
             text_color (int): Color del texto (RGB565)
         """
-        # Dibujar fondo
-        self.draw_rectangle(0, 0, self.display.width, 30, bg_color)
-        
-        # Dibujar texto principal
-        self.draw_text(10, 10, text, 2, text_color)
-        
-        # Mostrar modo de operación si se especifica
-        if mode:
-            mode_text = f"Modo: {mode}"
-            mode_x = self.display.width - (len(mode_text) * 8) - 10
-            self.draw_text(mode_x, 15, mode_text, 1, text_color)
+        # Cabecera completa con CS activo
+        with self.display.begin_data():
+            # Dibujar fondo
+            self.draw_rectangle(0, 0, self.display.width, 30, bg_color)
+            
+            # Dibujar texto principal
+            self.draw_text(10, 10, text, 2, text_color)
+            
+            # Mostrar modo de operación si se especifica
+            if mode:
+                mode_text = f"Modo: {mode}"
+                mode_x = self.display.width - (len(mode_text) * 8) - 10
+                self.draw_text(mode_x, 15, mode_text, 1, text_color)
     
-    def draw_footer(self, bg_color=BLACK, text_color=WHITE, line_color=CYAN):
+    def draw_footer(self, bg_color=BLACK, text_color=WHITE, line_color=CYAN, force=False):
         """
         Dibuja un pie de página con la fecha y hora actual
         
+        Solo se vuelve a dibujar lo que ha cambiado desde la llamada anterior:
+        normalmente la hora. Si algo se ha dibujado encima del pie de página
+        (por ejemplo, fill_screen), hay que llamar con force=True.
+        
         Args:
             bg_color (int): Color de fondo (RGB565)
             text_color (int): Color del texto (RGB565)
             line_color (int): Color de la línea separadora (RGB565)
+            force (bool): Redibujar el pie de página completo
         """
-        # Dibujar línea separadora
-        self.draw_horizontal_line(0, self.display.height - 21, self.display.width, line_color)
-        
-        # Dibujar fondo
-        self.draw_rectangle(0, self.display.height - 20, self.display.width, 20, bg_color)
-        
         # Obtener fecha y hora actual
-        current_time = datetime.now().strftime("%H:%M:%S")
-        current_date = datetime.now().strftime("%d/%m/%Y")
-        
-        # Mostrar fecha y hora
-        self.draw_text(10, self.display.height - 15, current_date, 1, text_color)
+        now = datetime.now()
+        current_date = now.strftime("%d/%m/%Y")
+        current_time = now.strftime("%H:%M:%S")
+        
+        layout = (self.display.width, self.display.height, bg_color, text_color, line_color)
+        last_layout, last_date, last_time = self._last_footer
+        
+        # Partes del pie de página con CS activo
+        with self.display.begin_data():
+            if force or layout != last_layout:
+                # Dibujar línea separadora
+                self.draw_horizontal_line(0, self.display.height - 21, self.display.width, line_color)
+                
+                # Dibujar fondo
+                self.draw_rectangle(0, self.display.height - 20, self.display.width, 20, bg_color)
+                last_date = last_time = None
+            
+            # Mostrar fecha y hora (los glifos incluyen su fondo, así que no
+            # hace falta borrar antes un texto de la misma longitud)
+            if current_date != last_date:
+                self.draw_text(10, self.display.height - 15, current_date, 1, text_color, bg_color)
+            
+            if current_time != last_time:
+                # Calcular posición para la hora (alineado a la derecha)
+                time_x = self.display.width - (len(current_time) * 8) - 10
+                self.draw_text(time_x, self.display.height - 15, current_time, 1, text_color, bg_color)
         
-        # Calcular posición para la hora (alineado a la derecha)
-        time_x = self.display.width - (len(current_time) * 8) - 10
-        self.draw_text(time_x, self.display.height - 15, current_time, 1, text_color)
\ No newline at end of file
+        self._last_footer = (layout, current_date, current_time)
@@ -19,6 +19,9 @@ setup(
     install_requires=[
         "spidev>=3.5",
         "RPi.GPIO>=0.7.0",
-        "numpy",
+        "numpy>=1.20",
     ],
+    extras_require={
+        "fast": ["numba>=0.56"],
+    },
 )
\ No newline at end of file